@@ -1,21 +1,50 @@
 import hashlib
 import hmac
-import json
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
 from urllib.parse import parse_qsl
 
+import orjson
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import select, update
+from redis.commands.core import AsyncScript
+from sqlalchemy import and_, bindparam, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.database import get_session, init_redis, parse_admin_ids, settings
+from sqlalchemy.orm import selectinload
+
+from app.database import (
+    ACTIVE_TASKS_KEY,
+    ACTIVE_TASKS_TTL,
+    get_session,
+    init_redis,
+    parse_admin_ids,
+    settings,
+)
 from app.models import Referral, Task, User, UserTask
 from app.ws import manager
 
 router = APIRouter()
 
+_RL_SCRIPT = (
+    "local c=redis.call('INCR',KEYS[1]); "
+    "if c==1 then redis.call('EXPIRE',KEYS[1],ARGV[1]) end; "
+    "return c"
+)
+_rl_script: AsyncScript | None = None
+
+_SECRET_KEY = hashlib.sha256(settings.bot_token.encode()).digest()
+_HMAC_TEMPLATE = hmac.new(_SECRET_KEY, b"", hashlib.sha256)
+
+_SEL_USER_BY_ID = select(User).where(User.id == bindparam("uid"))
+_SEL_COMPLETED_TASK_IDS = select(UserTask.task_id).where(UserTask.user_id == bindparam("uid"))
+_SEL_ACTIVE_TASKS_WITH_COMPLETION = (
+    select(Task, UserTask.task_id.is_not(None))
+    .outerjoin(UserTask, and_(UserTask.task_id == Task.id, UserTask.user_id == bindparam("uid")))
+    .where(Task.is_active.is_(True))
+)
+
 
 class AuthPayload(BaseModel):
     initData: str
@@ -35,18 +64,19 @@ class UserOut(BaseModel):
     is_banned: bool
 
 
+@lru_cache(maxsize=4096)
 def validate_init_data(init_data: str) -> dict:
     if not init_data:
         raise HTTPException(status_code=403, detail="Missing init data")
-    data_check_string = "\n".join(
-        [f"{k}={v}" for k, v in sorted(parse_qsl(init_data, keep_blank_values=True)) if k != "hash"]
-    )
-    values = dict(parse_qsl(init_data, keep_blank_values=True))
+    pairs = parse_qsl(init_data, keep_blank_values=True)
+    data_check_string = "\n".join([f"{k}={v}" for k, v in sorted(pairs) if k != "hash"])
+    values = dict(pairs)
     received_hash = values.get("hash")
     if not received_hash:
         raise HTTPException(status_code=403, detail="Invalid init data")
-    secret_key = hashlib.sha256(settings.bot_token.encode()).digest()
-    computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    digest = _HMAC_TEMPLATE.copy()
+    digest.update(data_check_string.encode())
+    computed_hash = digest.hexdigest()
     if not hmac.compare_digest(computed_hash, received_hash):
         raise HTTPException(status_code=403, detail="Invalid init data")
     if "user" not in values:
@@ -54,12 +84,18 @@ def validate_init_data(init_data: str) -> dict:
     return values
 
 
+@lru_cache(maxsize=4096)
+def validate_init_user(init_data: str) -> dict:
+    return orjson.loads(validate_init_data(init_data)["user"])
+
+
 async def rate_limit(request: Request) -> None:
-    redis = await init_redis()
+    global _rl_script
+    if _rl_script is None:
+        redis = await init_redis()
+        _rl_script = redis.register_script(_RL_SCRIPT)
     key = f"rl:{request.client.host}:{request.url.path}"
-    current = await redis.incr(key)
-    if current == 1:
-        await redis.expire(key, 60)
+    current = await _rl_script(keys=[key], args=[60])
     if current > 60:
         raise HTTPException(status_code=429, detail="Too many requests")
 
@@ -68,10 +104,9 @@ async def get_current_user(
     session: AsyncSession = Depends(get_session),
     x_telegram_init_data: str | None = Header(default=None, alias="X-Telegram-Init-Data"),
 ) -> User:
-    data = validate_init_data(x_telegram_init_data or "")
-    user_data = json.loads(data["user"])
+    user_data = validate_init_user(x_telegram_init_data or "")
     user_id = int(user_data["id"])
-    user = await session.get(User, user_id)
+    user = (await session.execute(_SEL_USER_BY_ID, {"uid": user_id})).scalars().first()
     if not user:
         raise HTTPException(status_code=403, detail="User not registered")
     if user.is_banned:
@@ -105,22 +140,31 @@ async def handle_referral(session: AsyncSession, user: User, start_param: str |
 @router.post("/auth/telegram", dependencies=[Depends(rate_limit)])
 async def auth_telegram(payload: AuthPayload, session: AsyncSession = Depends(get_session)) -> UserOut:
     data = validate_init_data(payload.initData)
-    user_data = json.loads(data["user"])
+    user_data = validate_init_user(payload.initData)
     user_id = int(user_data["id"])
     username = user_data.get("username")
-    user = await session.get(User, user_id)
+    user = (await session.execute(_SEL_USER_BY_ID, {"uid": user_id})).scalars().first()
     if not user:
-        role = "admin" if user_id in parse_admin_ids() else "user"
-        user = User(id=user_id, username=username, role=role, registered_at=datetime.utcnow())
-        session.add(user)
+        inserted = await session.execute(
+            mysql_insert(User)
+            .values(
+                id=user_id,
+                username=username,
+                role="admin" if user_id in parse_admin_ids() else "user",
+                registered_at=datetime.utcnow(),
+            )
+            .prefix_with("IGNORE")
+        )
+        await session.commit()
+        user = (await session.execute(_SEL_USER_BY_ID, {"uid": user_id})).scalars().one()
+        if inserted.rowcount == 1:
+            await handle_referral(session, user, data.get("start_param"))
+            return UserOut.model_validate(user)
+    if user.is_banned:
+        raise HTTPException(status_code=403, detail="User is banned")
+    if username and user.username != username:
+        user.username = username
         await session.commit()
-        await handle_referral(session, user, data.get("start_param"))
-    else:
-        if user.is_banned:
-            raise HTTPException(status_code=403, detail="User is banned")
-        if username and user.username != username:
-            user.username = username
-            await session.commit()
     return UserOut.model_validate(user)
 
 
@@ -134,20 +178,26 @@ async def list_tasks(
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> list[dict]:
-    tasks = (await session.execute(select(Task).where(Task.is_active.is_(True)))).scalars().all()
-    completed = (
-        await session.execute(select(UserTask.task_id).where(UserTask.user_id == user.id))
-    ).scalars().all()
-    completed_set = set(completed)
-    return [
+    redis = await init_redis()
+    cached = await redis.get(ACTIVE_TASKS_KEY)
+    if cached:
+        tasks = orjson.loads(cached)
+        completed = (
+            await session.execute(_SEL_COMPLETED_TASK_IDS, {"uid": user.id})
+        ).scalars().all()
+        completed_set = set(completed)
+        return [{**task, "completed": task["id"] in completed_set} for task in tasks]
+    rows = (await session.execute(_SEL_ACTIVE_TASKS_WITH_COMPLETION, {"uid": user.id})).all()
+    tasks = [
         {
             "id": task.id,
             "title": task.title,
             "reward": str(task.reward),
-            "completed": task.id in completed_set,
         }
-        for task in tasks
+        for task, _ in rows
     ]
+    await redis.set(ACTIVE_TASKS_KEY, orjson.dumps(tasks), ex=ACTIVE_TASKS_TTL)
+    return [{**task, "completed": bool(completed)} for task, (_, completed) in zip(tasks, rows)]
 
 
 @router.post("/tasks/{task_id}/complete", dependencies=[Depends(rate_limit)])
@@ -159,18 +209,35 @@ async def complete_task(
     task = await session.get(Task, task_id)
     if not task or not task.is_active:
         raise HTTPException(status_code=404, detail="Task not found")
-    existing = await session.get(UserTask, {"user_id": user.id, "task_id": task_id})
-    if existing and existing.completed:
-        return {"status": "already_completed"}
-    if not existing:
-        existing = UserTask(user_id=user.id, task_id=task_id, completed=True)
-        session.add(existing)
-    else:
-        existing.completed = True
-    user.balance = (user.balance or Decimal("0.00")) + task.reward
+    inserted = await session.execute(
+        mysql_insert(UserTask)
+        .values(user_id=user.id, task_id=task_id, completed=True)
+        .prefix_with("IGNORE")
+    )
+    if not inserted.rowcount:
+        updated = await session.execute(
+            update(UserTask)
+            .where(
+                UserTask.user_id == user.id,
+                UserTask.task_id == task_id,
+                UserTask.completed.is_(False),
+            )
+            .values(completed=True)
+            .execution_options(synchronize_session=False)
+        )
+        if not updated.rowcount:
+            await session.rollback()
+            return {"status": "already_completed"}
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(balance=func.coalesce(User.balance, Decimal("0.00")) + task.reward)
+        .execution_options(synchronize_session=False)
+    )
+    balance = (await session.execute(select(User.balance).where(User.id == user.id))).scalar_one()
     await session.commit()
-    await manager.send_balance(user.id, str(user.balance))
-    return {"status": "completed", "balance": str(user.balance)}
+    await manager.send_balance(user.id, str(balance))
+    return {"status": "completed", "balance": str(balance)}
 
 
 @router.get("/referrals", dependencies=[Depends(rate_limit)])
@@ -179,12 +246,17 @@ async def list_referrals(
     session: AsyncSession = Depends(get_session),
 ) -> list[dict]:
     rows = (
-        await session.execute(select(Referral).where(Referral.referrer_id == user.id))
+        await session.execute(
+            select(Referral)
+            .options(selectinload(Referral.referred))
+            .where(Referral.referrer_id == user.id)
+        )
     ).scalars().all()
     return [
         {
             "id": row.id,
             "referred_id": row.referred_id,
+            "username": row.referred.username if row.referred else None,
             "reward_paid": row.reward_paid,
         }
         for row in rows
@@ -7,7 +7,7 @@ from typing import AsyncGenerator
 from pydantic_settings import BaseSettings
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
-from redis.asyncio import Redis
+from redis.asyncio import ConnectionPool, Redis
 
 from app.models import Base, Task
 
@@ -23,9 +23,18 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-engine: AsyncEngine = create_async_engine(settings.database_url, pool_pre_ping=True)
+engine: AsyncEngine = create_async_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,
+    pool_timeout=5,
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 redis_client: Redis | None = None
+ACTIVE_TASKS_KEY = "tasks:active"
+ACTIVE_TASKS_TTL = 60
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -36,10 +45,21 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 async def init_redis() -> Redis:
     global redis_client
     if redis_client is None:
-        redis_client = Redis.from_url(settings.redis_url, decode_responses=True)
+        pool = ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=100,
+            health_check_interval=30,
+            decode_responses=True,
+        )
+        redis_client = Redis(connection_pool=pool)
     return redis_client
 
 
+async def invalidate_active_tasks() -> None:
+    redis = await init_redis()
+    await redis.delete(ACTIVE_TASKS_KEY)
+
+
 async def seed_tasks(session: AsyncSession) -> None:
     existing = await session.execute(select(Task))
     if existing.scalars().first():
@@ -51,6 +71,7 @@ async def seed_tasks(session: AsyncSession) -> None:
         ]
     )
     await session.commit()
+    await invalidate_active_tasks()
 
 
 @asynccontextmanager
@@ -62,17 +83,16 @@ async def lifespan(_: object):
     await init_redis()
     yield
     if redis_client is not None:
-        await redis_client.close()
+        await redis_client.aclose()
+        await redis_client.connection_pool.disconnect()
     await engine.dispose()
 
 
-def parse_admin_ids() -> set[int]:
-    ids = set()
-    for raw in settings.admin_ids.split(","):
-        raw = raw.strip()
-        if raw:
-            ids.add(int(raw))
-    return ids
+_ADMIN_IDS = frozenset(int(raw.strip()) for raw in settings.admin_ids.split(",") if raw.strip())
+
+
+def parse_admin_ids() -> frozenset[int]:
+    return _ADMIN_IDS
 
 
 async def wait_for_db() -> None:
@@ -1,7 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Numeric, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Numeric, String
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.types import BigInteger
 
@@ -26,12 +26,18 @@ class User(Base):
 
 class Referral(Base):
     __tablename__ = "referrals"
+    __table_args__ = (
+        Index("ix_referrals_referrer", "referrer_id"),
+        Index("ix_referrals_referred", "referred_id"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     referrer_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"))
     referred_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"))
     reward_paid: Mapped[bool] = mapped_column(Boolean, default=False)
 
+    referred = relationship("User", foreign_keys=[referred_id])
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -1,31 +1,45 @@
-import json
+import asyncio
+from collections import defaultdict
+from contextlib import suppress
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 
-from app.api import validate_init_data
+from app.api import validate_init_user
 
 ws_router = APIRouter()
+SEND_TIMEOUT = 2.0
 
 
 class ConnectionManager:
     def __init__(self) -> None:
-        self.active: dict[int, set[WebSocket]] = {}
+        self.active: defaultdict[int, set[WebSocket]] = defaultdict(set)
 
     async def connect(self, user_id: int, websocket: WebSocket) -> None:
         await websocket.accept()
-        self.active.setdefault(user_id, set()).add(websocket)
+        self.active[user_id].add(websocket)
 
     def disconnect(self, user_id: int, websocket: WebSocket) -> None:
         connections = self.active.get(user_id)
-        if connections:
-            connections.discard(websocket)
-            if not connections:
-                self.active.pop(user_id, None)
+        if connections is None:
+            return
+        connections.discard(websocket)
+        if not connections:
+            self.active.pop(user_id, None)
 
     async def send_balance(self, user_id: int, balance: str) -> None:
-        payload = json.dumps({"balance": balance})
-        for ws in list(self.active.get(user_id, set())):
-            await ws.send_text(payload)
+        payload = orjson.dumps({"balance": balance})
+
+        async def send_one(ws: WebSocket) -> None:
+            try:
+                await asyncio.wait_for(ws.send_bytes(payload), SEND_TIMEOUT)
+            except Exception:
+                self.disconnect(user_id, ws)
+                with suppress(Exception):
+                    await asyncio.wait_for(ws.close(code=1011), SEND_TIMEOUT)
+
+        connections = tuple(self.active.get(user_id, ()))
+        await asyncio.gather(*(send_one(ws) for ws in connections), return_exceptions=True)
 
 
 manager = ConnectionManager()
@@ -36,8 +50,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, initData: str |
     if not initData:
         await websocket.close(code=1008)
         return
-    data = validate_init_data(initData)
-    user_data = json.loads(data["user"])
+    user_data = validate_init_user(initData)
     if int(user_data["id"]) != user_id:
         await websocket.close(code=1008)
         return
@@ -66,9 +66,13 @@ const App = () => {
         me.id
       }?initData=${encodeURIComponent(initData)}`
     );
+    ws.binaryType = "arraybuffer";
+    const decoder = new TextDecoder();
     ws.onmessage = (event) => {
       try {
-        const payload = JSON.parse(event.data);
+        const payload = JSON.parse(
+          typeof event.data === "string" ? event.data : decoder.decode(event.data)
+        );
         setMe((prev) => (prev ? { ...prev, balance: payload.balance } : prev));
       } catch (err) {
         console.error(err);